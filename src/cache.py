@@ -0,0 +1,51 @@
+import os
+import time
+import logging
+import orjson
+
+class FileCache:
+    """Small JSON file cache with a per-entry time to live.
+    
+    Values may contain NumPy arrays; they are stored as JSON lists.
+    """
+    
+    def __init__(self, cache_dir=".cache"):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    def _cache_file(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def get(self, key):
+        """
+        Return the cached value for key, or None if missing or expired.
+        """
+        cache_file = self._cache_file(key)
+        try:
+            with open(cache_file, 'rb') as f:
+                entry = orjson.loads(f.read())
+        except (OSError, ValueError):
+            self.logger.info(f"Cache miss: {key}")
+            return None
+        
+        if entry['expires_at'] <= time.time():
+            self.logger.info(f"Cache expired: {key}")
+            os.remove(cache_file)
+            return None
+        
+        self.logger.info(f"Cache hit: {key}")
+        return entry['value']
+    
+    def set(self, key, value, ttl):
+        """
+        Store value under key for ttl seconds.
+        """
+        cache_file = self._cache_file(key)
+        tmp_file = cache_file + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps(
+                {'expires_at': time.time() + ttl, 'value': value},
+                option=orjson.OPT_SERIALIZE_NUMPY
+            ))
+        os.replace(tmp_file, cache_file)
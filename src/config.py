@@ -0,0 +1,43 @@
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from dotenv import load_dotenv
+
+load_dotenv()
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Settings read once from the environment (and .env) at import."""
+    ticker: str
+    market_timezone: str
+    # Kept out of repr so logging CONFIG or a traceback never prints the key
+    polygon_api_key: str = field(repr=False)
+    force_refresh: bool
+
+    @property
+    def tickers(self):
+        """TICKER split on commas; the first entry is the primary ticker."""
+        return tuple(t.strip() for t in self.ticker.split(',') if t.strip())
+
+CONFIG = Config(
+    ticker=os.getenv('TICKER', 'SPY'),
+    market_timezone=os.getenv('MARKET_TIMEZONE', 'America/New_York'),
+    polygon_api_key=os.getenv('POLYGON_API_KEY', ''),
+    force_refresh=os.getenv('FORCE_REFRESH', '').strip().lower() in ('1', 'true', 'yes'),
+)
+
+def seconds_until_next_weekday_time(timezone_name, hour, minute):
+    """
+    Seconds until the next weekday hour:minute in the given timezone.
+    """
+    tz = ZoneInfo(timezone_name)
+    now = datetime.now(tz)
+    day = now.date()
+    
+    while True:
+        target = datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz)
+        if target > now and target.weekday() < 5:
+            # Same-tzinfo subtraction ignores DST changes, so compare timestamps
+            return target.timestamp() - now.timestamp()
+        day += timedelta(days=1)
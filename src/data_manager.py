@@ -1,49 +1,98 @@
-import json
+import atexit
 import csv
 import os
+from pathlib import Path
 from datetime import datetime, timedelta
 import logging
 import numpy as np
+import orjson
 
-class NumpyEncoder(json.JSONEncoder):
-    """Custom JSON encoder to handle numpy types."""
-    def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        elif isinstance(obj, np.bool_):
-            return bool(obj)
-        return super(NumpyEncoder, self).default(obj)
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:  # history falls back to CSV
+    pa = None
+
+SUMMARY_COLUMNS = [
+    'date', 'ticker', 'current_price', 'expiration_date',
+    'days_to_expiration', 'max_pain_price', 'distance_dollars', 
+    'distance_percent', 'put_call_ratio', 'total_put_oi', 
+    'total_call_oi', 'contracts_analyzed'
+]
+
+if pa is not None:
+    SUMMARY_SCHEMA = pa.schema([
+        ('date', pa.string()),
+        ('ticker', pa.string()),
+        ('current_price', pa.float64()),
+        ('expiration_date', pa.string()),
+        ('days_to_expiration', pa.int64()),
+        ('max_pain_price', pa.float64()),
+        ('distance_dollars', pa.float64()),
+        ('distance_percent', pa.float64()),
+        ('put_call_ratio', pa.float64()),
+        ('total_put_oi', pa.int64()),
+        ('total_call_oi', pa.int64()),
+        ('contracts_analyzed', pa.int64()),
+    ])
+
+def _np_default(obj):
+    """Serialize numpy types orjson does not handle natively."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
 
 class DataManager:
+    # Directories only need creating once per process
+    _dirs_ready = False
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.data_dir = "data"
+        self._summary_writers = {}
         self.ensure_directories()
+        atexit.register(self.close)
     
     def ensure_directories(self):
         """Create necessary directories if they don't exist."""
+        if DataManager._dirs_ready:
+            return
+        
         os.makedirs(self.data_dir, exist_ok=True)
         os.makedirs(os.path.join(self.data_dir, "daily"), exist_ok=True)
         os.makedirs(os.path.join(self.data_dir, "summaries"), exist_ok=True)
+        DataManager._dirs_ready = True
+    
+    def save_all(self, ticker, result, current_price):
+        """
+        Save detailed results and the daily summary for one calculation.
+        
+        Both files are stamped from a single clock reading so the daily file
+        and its history row always agree on the date.
+        """
+        now = datetime.now()
+        self.save_calculation_results(ticker, result, now=now)
+        self.save_daily_summary(ticker, result, current_price, now=now)
     
-    def save_calculation_results(self, ticker, results):
+    def save_calculation_results(self, ticker, results, now=None):
         """
         Save detailed calculation results to JSON file.
         """
         try:
-            date_str = datetime.now().strftime("%Y-%m-%d")
+            date_str = (now or datetime.now()).strftime("%Y-%m-%d")
             filename = os.path.join(
                 self.data_dir, 
                 "daily", 
                 f"{ticker}_{date_str}_max_pain.json"
             )
             
-            with open(filename, 'w') as f:
-                json.dump(results, f, indent=2, cls=NumpyEncoder)
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(
+                    results,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+                    default=_np_default
+                ))
             
             self.logger.info(f"Saved calculation results to {filename}")
             
@@ -51,92 +100,171 @@ class DataManager:
             self.logger.error(f"Error saving calculation results: {str(e)}")
             raise
     
-    def save_daily_summary(self, ticker, result, current_price):
+    def close(self):
+        """
+        Close any history files held open by this instance.
+        """
+        for f, _ in self._summary_writers.values():
+            f.close()
+        self._summary_writers.clear()
+    
+    def _summary_file(self, ticker, extension):
         """
-        Save daily summary to CSV for tracking over time.
+        Path of the max pain history file for a ticker.
+        """
+        return os.path.join(
+            self.data_dir, 
+            "summaries", 
+            f"{ticker}_max_pain_history.{extension}"
+        )
+    
+    def save_daily_summary(self, ticker, result, current_price, now=None):
+        """
+        Save daily summary to the history file for tracking over time.
+        
+        History is stored as Parquet when pyarrow is available, otherwise CSV.
         """
         try:
-            csv_file = os.path.join(
-                self.data_dir, 
-                "summaries", 
-                f"{ticker}_max_pain_history.csv"
-            )
+            date_str = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+            row = [
+                date_str,
+                ticker,
+                current_price,
+                result['expiration_date'],
+                result.get('days_to_expiration', 0),
+                result['max_pain_price'],
+                result['distance_from_current'],
+                result['percentage_from_current'],
+                result['put_call_ratio'],
+                result['total_put_oi'],
+                result['total_call_oi'],
+                result['total_contracts_analyzed']
+            ]
             
-            # Check if file exists to determine if we need headers
-            file_exists = os.path.exists(csv_file)
+            if pa is not None:
+                summary_file = self._summary_file(ticker, "parquet")
+                self._append_parquet_row(summary_file, self._summary_file(ticker, "csv"), row)
+            else:
+                summary_file = self._summary_file(ticker, "csv")
+                self._append_csv_row(summary_file, row)
             
-            with open(csv_file, 'a', newline='') as f:
-                writer = csv.writer(f)
-                
-                # Write headers if new file
-                if not file_exists:
-                    headers = [
-                        'date', 'ticker', 'current_price', 'expiration_date',
-                        'days_to_expiration', 'max_pain_price', 'distance_dollars', 
-                        'distance_percent', 'put_call_ratio', 'total_put_oi', 
-                        'total_call_oi', 'contracts_analyzed'
-                    ]
-                    writer.writerow(headers)
-                
-                # Write data
-                date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                row = [
-                    date_str,
-                    ticker,
-                    current_price,
-                    result['expiration_date'],
-                    result.get('days_to_expiration', 0),
-                    result['max_pain_price'],
-                    result['distance_from_current'],
-                    result['percentage_from_current'],
-                    result['put_call_ratio'],
-                    result['total_put_oi'],
-                    result['total_call_oi'],
-                    result['total_contracts_analyzed']
-                ]
-                writer.writerow(row)
-            
-            self.logger.info(f"Saved daily summary to {csv_file}")
+            self.logger.info(f"Saved daily summary to {summary_file}")
             
         except Exception as e:
             self.logger.error(f"Error saving daily summary: {str(e)}")
             raise
     
+    def _append_csv_row(self, csv_file, row):
+        """
+        Append a summary row to the CSV history.
+        
+        The file is opened once per instance and kept open, flushing after
+        every row, so repeated summaries do not reopen it.
+        """
+        if csv_file not in self._summary_writers:
+            f = open(csv_file, 'a', newline='')
+            writer = csv.writer(f)
+            
+            # Write headers if new file
+            if os.path.getsize(csv_file) == 0:
+                writer.writerow(SUMMARY_COLUMNS)
+            
+            self._summary_writers[csv_file] = (f, writer)
+        
+        f, writer = self._summary_writers[csv_file]
+        writer.writerow(row)
+        f.flush()
+    
+    def _append_parquet_row(self, parquet_file, legacy_csv_file, row):
+        """
+        Append a summary row to the Parquet history as a new row group.
+        
+        Parquet files cannot be reopened for appending, so existing row groups
+        are copied into a fresh file next to the new one and swapped in
+        atomically. A new history is seeded from the legacy CSV if present.
+        """
+        table = pa.Table.from_pylist([dict(zip(SUMMARY_COLUMNS, row))], schema=SUMMARY_SCHEMA)
+        tmp_file = parquet_file + ".tmp"
+        
+        with pq.ParquetWriter(tmp_file, SUMMARY_SCHEMA, compression='zstd') as writer:
+            if os.path.exists(parquet_file):
+                with pq.ParquetFile(parquet_file) as existing:
+                    for i in range(existing.num_row_groups):
+                        writer.write_table(existing.read_row_group(i))
+            elif os.path.exists(legacy_csv_file):
+                legacy = pacsv.read_csv(
+                    legacy_csv_file,
+                    convert_options=pacsv.ConvertOptions(
+                        column_types=dict(zip(SUMMARY_SCHEMA.names, SUMMARY_SCHEMA.types))
+                    )
+                )
+                writer.write_table(legacy.select(SUMMARY_COLUMNS).cast(SUMMARY_SCHEMA))
+            
+            writer.write_table(table)
+        
+        os.replace(tmp_file, parquet_file)
+    
     def load_historical_data(self, ticker, days=30):
         """
         Load historical max pain data for analysis.
         """
         try:
-            csv_file = os.path.join(
-                self.data_dir, 
-                "summaries", 
-                f"{ticker}_max_pain_history.csv"
-            )
+            # Timestamps are zero-padded, so string order matches date order
+            cutoff_str = None
+            if days:
+                cutoff_date = datetime.now() - timedelta(days=days)
+                cutoff_str = cutoff_date.strftime("%Y-%m-%d %H:%M:%S")
+            
+            history_file = self._summary_file(ticker, "parquet")
+            if pa is None or not os.path.exists(history_file):
+                history_file = self._summary_file(ticker, "csv")
             
-            if not os.path.exists(csv_file):
+            if not os.path.exists(history_file):
                 return []
             
+            if history_file.endswith(".parquet"):
+                filters = [('date', '>=', cutoff_str)] if cutoff_str else None
+                return pq.read_table(history_file, filters=filters).to_pylist()
+            
             data = []
-            with open(csv_file, 'r') as f:
-                reader = csv.DictReader(f)
+            with open(history_file, 'r', newline='') as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is None:
+                    return []
+                
+                idx_date = header.index('date')
+                idx_current_price = header.index('current_price')
+                idx_days_to_expiration = header.index('days_to_expiration')
+                idx_max_pain_price = header.index('max_pain_price')
+                idx_distance_dollars = header.index('distance_dollars')
+                idx_distance_percent = header.index('distance_percent')
+                idx_put_call_ratio = header.index('put_call_ratio')
+                idx_total_put_oi = header.index('total_put_oi')
+                idx_total_call_oi = header.index('total_call_oi')
+                idx_contracts_analyzed = header.index('contracts_analyzed')
+                
                 for row in reader:
+                    # Blank lines come back as [], which DictReader used to skip
+                    if not row:
+                        continue
+                    # Skip old rows before converting anything
+                    if cutoff_str and row[idx_date] < cutoff_str:
+                        continue
+                    
+                    record = dict(zip(header, row))
+                    
                     # Convert string values to appropriate types
-                    row['current_price'] = float(row['current_price'])
-                    row['max_pain_price'] = float(row['max_pain_price'])
-                    row['distance_dollars'] = float(row['distance_dollars']) if row['distance_dollars'] else None
-                    row['distance_percent'] = float(row['distance_percent']) if row['distance_percent'] else None
-                    row['put_call_ratio'] = float(row['put_call_ratio'])
-                    row['total_put_oi'] = int(row['total_put_oi'])
-                    row['total_call_oi'] = int(row['total_call_oi'])
-                    data.append(row)
-            
-            # Filter by days if specified
-            if days:
-                cutoff_date = datetime.now() - timedelta(days=days)
-                data = [
-                    row for row in data 
-                    if datetime.strptime(row['date'], "%Y-%m-%d %H:%M:%S") >= cutoff_date
-                ]
+                    record['current_price'] = float(row[idx_current_price])
+                    record['days_to_expiration'] = int(row[idx_days_to_expiration])
+                    record['max_pain_price'] = float(row[idx_max_pain_price])
+                    record['distance_dollars'] = float(row[idx_distance_dollars]) if row[idx_distance_dollars] else None
+                    record['distance_percent'] = float(row[idx_distance_percent]) if row[idx_distance_percent] else None
+                    record['put_call_ratio'] = float(row[idx_put_call_ratio])
+                    record['total_put_oi'] = int(row[idx_total_put_oi])
+                    record['total_call_oi'] = int(row[idx_total_call_oi])
+                    record['contracts_analyzed'] = int(row[idx_contracts_analyzed])
+                    data.append(record)
             
             return data
             
@@ -149,9 +277,10 @@ class DataManager:
         Generate a human-readable report of the max pain calculation.
         """
         try:
+            now = datetime.now()
             report_lines = [
                 f"MAX PAIN REPORT - {ticker}",
-                f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                f"Generated: {now.strftime('%Y-%m-%d %H:%M:%S')}",
                 f"Current Price: ${current_price:.2f}",
                 "=" * 60,
                 "",
@@ -167,12 +296,12 @@ class DataManager:
                 "Nearby Strike Analysis:",
             ]
             
-            for strike_info in result['nearby_strikes']:
-                marker = " <- MAX PAIN" if strike_info['is_max_pain'] else ""
-                report_lines.append(
-                    f"  ${strike_info['strike']:.2f}: "
-                    f"Pain Value = ${strike_info['pain']:,.0f}{marker}"
-                )
+            report_lines.extend(
+                f"  ${strike_info['strike']:.2f}: "
+                f"Pain Value = ${strike_info['pain']:,.0f}"
+                f"{' <- MAX PAIN' if strike_info['is_max_pain'] else ''}"
+                for strike_info in result['nearby_strikes']
+            )
             
             report = "\n".join(report_lines)
             
@@ -180,11 +309,10 @@ class DataManager:
             report_file = os.path.join(
                 self.data_dir,
                 "daily",
-                f"{ticker}_{datetime.now().strftime('%Y-%m-%d')}_report.txt"
+                f"{ticker}_{now.strftime('%Y-%m-%d')}_report.txt"
             )
             
-            with open(report_file, 'w') as f:
-                f.write(report)
+            Path(report_file).write_text(report)
             
             self.logger.info(f"Generated report: {report_file}")
             return report
@@ -1,9 +1,12 @@
-import random
 from datetime import datetime, timedelta
+import numpy as np
 
 class DemoDataGenerator:
     """Generate realistic demo options data for testing."""
     
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+    
     def generate_options_chain(self, ticker='SPY', current_price=450.0):
         """Generate demo options chain data."""
         options_data = []
@@ -27,70 +30,75 @@ class DemoDataGenerator:
         min_strike = int(current_price * 0.9 / strike_interval) * strike_interval
         max_strike = int(current_price * 1.1 / strike_interval) * strike_interval
         
-        strikes = []
-        strike = min_strike
-        while strike <= max_strike:
-            strikes.append(strike)
-            strike += strike_interval
+        strikes = np.arange(min_strike, max_strike + strike_interval / 2, strike_interval)
+        strike_list = strikes.tolist()
+        rng = self.rng
+        
+        # Generate realistic open interest based on distance from current price
+        distance_pct = np.abs(strikes - current_price) / current_price
+        otm_scale = np.maximum(0.1, 1 - distance_pct * 2)
+        itm_call = strikes < current_price
+        itm_put = strikes > current_price
+        call_scale = np.where(itm_call, 1 + (current_price - strikes) / current_price, otm_scale)
+        put_scale = np.where(itm_put, 1 + (strikes - current_price) / current_price, otm_scale)
+        
+        call_price = np.where(itm_call, current_price - strikes, 0.5 * np.maximum(0, 1 - distance_pct))
+        call_price = np.maximum(0.01, call_price).tolist()
+        put_price = np.where(itm_put, strikes - current_price, 0.5 * np.maximum(0, 1 - distance_pct))
+        put_price = np.maximum(0.01, put_price).tolist()
+        
+        # Generate options for each expiration and strike in one batch
+        shape = (len(expiration_dates), len(strikes))
         
-        # Generate options for each expiration and strike
-        for exp_date in expiration_dates:
-            days_to_exp = (datetime.strptime(exp_date, '%Y-%m-%d') - today).days
+        # Calls (ITM calls have higher OI), plus some randomness
+        call_oi = (rng.integers(500, 5001, size=shape) * call_scale).astype(np.int64)
+        call_oi = np.maximum(0, call_oi + rng.integers(-200, 201, size=shape))
+        call_volume = rng.integers(0, call_oi // 2 + 1)
+        
+        # Puts (ITM puts have higher OI), plus some randomness and typically higher put OI
+        put_oi = (rng.integers(500, 5001, size=shape) * put_scale).astype(np.int64)
+        put_oi = np.maximum(0, (put_oi * 1.2).astype(np.int64) + rng.integers(-200, 201, size=shape))
+        put_volume = rng.integers(0, put_oi // 2 + 1)
+        
+        # Add some concentrated open interest at key levels
+        # This creates more realistic max pain scenarios
+        key_strikes = [
+            round(current_price / strike_interval) * strike_interval,  # ATM
+            round((current_price - 5) / strike_interval) * strike_interval,  # Slightly below
+            round((current_price + 5) / strike_interval) * strike_interval,  # Slightly above
+        ]
+        
+        boost = (
+            (np.array(expiration_dates) == expiration_dates[0])[:, None]
+            & np.isin(strikes, key_strikes)[None, :]
+        )
+        call_oi[boost] = (call_oi[boost] * rng.uniform(1.5, 2.5, size=boost.sum())).astype(np.int64)
+        put_oi[boost] = (put_oi[boost] * rng.uniform(1.5, 2.5, size=boost.sum())).astype(np.int64)
+        
+        call_oi, call_volume = call_oi.tolist(), call_volume.tolist()
+        put_oi, put_volume = put_oi.tolist(), put_volume.tolist()
+        
+        for e, exp_date in enumerate(expiration_dates):
+            exp_code = exp_date.replace("-", "")
             
-            for strike in strikes:
-                # Generate realistic open interest based on distance from current price
-                distance_pct = abs(strike - current_price) / current_price
-                
-                # Calls
-                call_oi_base = random.randint(500, 5000)
-                if strike < current_price:  # ITM calls have higher OI
-                    call_oi = int(call_oi_base * (1 + (current_price - strike) / current_price))
-                else:  # OTM calls
-                    call_oi = int(call_oi_base * max(0.1, 1 - distance_pct * 2))
-                
-                # Add some randomness
-                call_oi = max(0, call_oi + random.randint(-200, 200))
-                
+            for k, strike in enumerate(strike_list):
                 options_data.append({
-                    'contract_ticker': f'O:{ticker}{exp_date.replace("-", "")}C{int(strike * 1000)}',
+                    'contract_ticker': f'O:{ticker}{exp_code}C{int(strike * 1000)}',
                     'strike_price': strike,
                     'contract_type': 'call',
                     'expiration_date': exp_date,
-                    'open_interest': call_oi,
-                    'volume': random.randint(0, call_oi // 2),
-                    'last_price': max(0.01, (current_price - strike) if strike < current_price else 0.5 * max(0, 1 - distance_pct))
+                    'open_interest': call_oi[e][k],
+                    'volume': call_volume[e][k],
+                    'last_price': call_price[k]
                 })
-                
-                # Puts
-                put_oi_base = random.randint(500, 5000)
-                if strike > current_price:  # ITM puts have higher OI
-                    put_oi = int(put_oi_base * (1 + (strike - current_price) / current_price))
-                else:  # OTM puts
-                    put_oi = int(put_oi_base * max(0.1, 1 - distance_pct * 2))
-                
-                # Add some randomness and typically higher put OI
-                put_oi = max(0, int(put_oi * 1.2) + random.randint(-200, 200))
-                
                 options_data.append({
-                    'contract_ticker': f'O:{ticker}{exp_date.replace("-", "")}P{int(strike * 1000)}',
+                    'contract_ticker': f'O:{ticker}{exp_code}P{int(strike * 1000)}',
                     'strike_price': strike,
                     'contract_type': 'put',
                     'expiration_date': exp_date,
-                    'open_interest': put_oi,
-                    'volume': random.randint(0, put_oi // 2),
-                    'last_price': max(0.01, (strike - current_price) if strike > current_price else 0.5 * max(0, 1 - distance_pct))
+                    'open_interest': put_oi[e][k],
+                    'volume': put_volume[e][k],
+                    'last_price': put_price[k]
                 })
         
-        # Add some concentrated open interest at key levels
-        # This creates more realistic max pain scenarios
-        key_strikes = [
-            round(current_price / strike_interval) * strike_interval,  # ATM
-            round((current_price - 5) / strike_interval) * strike_interval,  # Slightly below
-            round((current_price + 5) / strike_interval) * strike_interval,  # Slightly above
-        ]
-        
-        for i, option in enumerate(options_data):
-            if option['strike_price'] in key_strikes and option['expiration_date'] == expiration_dates[0]:
-                options_data[i]['open_interest'] = int(option['open_interest'] * random.uniform(1.5, 2.5))
-        
         return options_data
\ No newline at end of file
@@ -1,16 +1,24 @@
 #!/usr/bin/env python3
 import logging
+import os
 import sys
+from logging.handlers import RotatingFileHandler
 import argparse
 from scheduler import MaxPainScheduler
 
 def setup_logging():
     """Configure logging for the application."""
+    os.makedirs('logs', exist_ok=True)
+    
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         handlers=[
-            logging.FileHandler('logs/max_pain_calculator.log'),
+            RotatingFileHandler(
+                'logs/max_pain_calculator.log',
+                maxBytes=10_000_000,
+                backupCount=3
+            ),
             logging.StreamHandler(sys.stdout)
         ]
     )
@@ -57,7 +65,7 @@ def main():
             
             # Load today's results
             from datetime import datetime
-            import json
+            import orjson
             import os
             
             date_str = datetime.now().strftime("%Y-%m-%d")
@@ -66,8 +74,8 @@ def main():
             )
             
             if os.path.exists(results_file):
-                with open(results_file, 'r') as f:
-                    result = json.load(f)
+                with open(results_file, 'rb') as f:
+                    result = orjson.loads(f.read())
                 
                 report = dm.generate_report(
                     ticker, 
@@ -1,19 +1,92 @@
-import pandas as pd
 import numpy as np
 import logging
 from datetime import datetime
 
+try:
+    from numba import njit
+except ImportError:  # fall back to the vectorized NumPy kernel
+    njit = None
+
+def _max_pain_scan(strikes, put_oi, call_oi):
+    """
+    Total pain at each sorted strike and the index of the minimum.
+    
+    Call pain at s_i is the sum over calls below s_i of (s_i - K) * OI and
+    put pain the sum over puts above s_i of (K - s_i) * OI. Both follow from
+    running totals of OI and K * OI, one scan from each side.
+    """
+    n = strikes.shape[0]
+    pain = np.zeros(n)
+    
+    # Calls below each strike, scanning up
+    oi_sum = 0.0
+    soi_sum = 0.0
+    for i in range(n):
+        pain[i] = strikes[i] * oi_sum - soi_sum
+        oi_sum += call_oi[i]
+        soi_sum += strikes[i] * call_oi[i]
+    
+    # Puts above each strike, scanning down
+    oi_sum = 0.0
+    soi_sum = 0.0
+    for i in range(n - 1, -1, -1):
+        pain[i] += soi_sum - strikes[i] * oi_sum
+        oi_sum += put_oi[i]
+        soi_sum += strikes[i] * put_oi[i]
+    
+    best = 0
+    for i in range(n):
+        pain[i] *= 100
+        if pain[i] < pain[best]:
+            best = i
+    
+    return best, pain
+
+def _max_pain_vectorized(strikes, put_oi, call_oi):
+    """
+    NumPy equivalent of _max_pain_scan, built from cumulative sums.
+    """
+    # Call pain at strike s_i: s_i * cumsum(OI) - cumsum(K * OI) over the strikes before i
+    c_oi_cum = np.cumsum(call_oi)
+    c_soi_cum = np.cumsum(strikes * call_oi)
+    call_pain = np.zeros(len(strikes), dtype=np.float64)
+    call_pain[1:] = strikes[1:] * c_oi_cum[:-1] - c_soi_cum[:-1]
+    
+    # Put pain at strike s_i: the same prefix sums taken from the right
+    p_oi_cum = np.cumsum(put_oi[::-1])[::-1]
+    p_soi_cum = np.cumsum((strikes * put_oi)[::-1])[::-1]
+    put_pain = np.zeros(len(strikes), dtype=np.float64)
+    put_pain[:-1] = p_soi_cum[1:] - strikes[:-1] * p_oi_cum[1:]
+    
+    pain = (call_pain + put_pain) * 100
+    return int(np.argmin(pain)), pain
+
+if njit is not None:
+    # An explicit signature compiles at import rather than on the first
+    # calculation, which for the scheduler is hours after start-up
+    _max_pain_kernel = njit(
+        'Tuple((int64, float64[:]))(float64[:], float64[:], float64[:])',
+        cache=True, fastmath=True
+    )(_max_pain_scan)
+else:
+    _max_pain_kernel = _max_pain_vectorized
+
 class MaxPainCalculator:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
     
-    def calculate_max_pain(self, options_data, current_stock_price=None):
+    def calculate_max_pain(self, options_data, current_stock_price=None, _validate=None):
         """
         Calculate the max pain price based on options data.
         
         Args:
-            options_data: List of dictionaries containing option contract data
+            options_data: List of dictionaries containing option contract data,
+                or a mapping of 'strikes', 'put_oi' and 'call_oi' arrays (and
+                optionally 'contract_count') as returned by PolygonOptionsClient
             current_stock_price: Current price of the underlying stock
+            _validate: Drop contracts with zero open interest first. Defaults
+                to True for lists of dicts (demo data, CSV) and False for the
+                arrays from PolygonOptionsClient, which are already filtered.
             
         Returns:
             Dictionary containing max pain price and related statistics
@@ -22,104 +95,214 @@ class MaxPainCalculator:
             if not options_data:
                 raise ValueError("No options data provided")
             
-            # Convert to DataFrame for easier manipulation
-            df = pd.DataFrame(options_data)
-            
-            # Filter out contracts with zero open interest
-            df = df[df['open_interest'] > 0]
-            
-            if df.empty:
-                raise ValueError("No options with open interest found")
-            
-            # Get unique strike prices
-            strike_prices = sorted(df['strike_price'].unique())
-            
-            # Vectorized pain calculation for better performance
-            pain_values = []
-            
-            # Separate calls and puts
-            calls_df = df[df['contract_type'] == 'call']
-            puts_df = df[df['contract_type'] == 'put']
-            
-            for strike in strike_prices:
-                # Calculate pain for calls (ITM calls when price < strike)
-                itm_calls = calls_df[calls_df['strike_price'] < strike]
-                call_pain = ((strike - itm_calls['strike_price']) * itm_calls['open_interest'] * 100).sum()
-                
-                # Calculate pain for puts (ITM puts when price > strike)
-                itm_puts = puts_df[puts_df['strike_price'] > strike]
-                put_pain = ((itm_puts['strike_price'] - strike) * itm_puts['open_interest'] * 100).sum()
-                
-                pain_values.append({
-                    'strike_price': strike,
-                    'total_pain': call_pain + put_pain
-                })
-            
-            # Convert to DataFrame
-            pain_df = pd.DataFrame(pain_values)
+            contract_count = None
+            is_arrays = isinstance(options_data, dict)
+            if _validate is None:
+                _validate = not is_arrays
+            if is_arrays:
+                arrays = {key: np.asarray(options_data[key], dtype=np.float64)
+                          for key in ('strikes', 'put_oi', 'call_oi')}
+                # Rows may already be summed per strike, so len() undercounts
+                contract_count = options_data.get('contract_count')
+            else:
+                arrays = self._build_arrays(options_data, expirations=False)
             
-            # Find the strike price with minimum total pain (max pain for option holders)
-            max_pain_row = pain_df.loc[pain_df['total_pain'].idxmin()]
-            max_pain_price = max_pain_row['strike_price']
-            
-            # Calculate Put/Call ratio
-            total_put_oi = df[df['contract_type'] == 'put']['open_interest'].sum()
-            total_call_oi = df[df['contract_type'] == 'call']['open_interest'].sum()
-            pc_ratio = total_put_oi / total_call_oi if total_call_oi > 0 else 0
-            
-            # Get nearby strikes for context
-            max_pain_idx = pain_df.index[pain_df['strike_price'] == max_pain_price][0]
-            nearby_strikes = []
-            
-            for i in range(max(0, max_pain_idx - 2), min(len(pain_df), max_pain_idx + 3)):
-                nearby_strikes.append({
-                    'strike': pain_df.iloc[i]['strike_price'],
-                    'pain': pain_df.iloc[i]['total_pain'],
-                    'is_max_pain': i == max_pain_idx
-                })
-            
-            result = {
-                'max_pain_price': max_pain_price,
-                'current_stock_price': current_stock_price,
-                'distance_from_current': abs(current_stock_price - max_pain_price) if current_stock_price else None,
-                'percentage_from_current': ((max_pain_price - current_stock_price) / current_stock_price * 100) if current_stock_price else None,
-                'put_call_ratio': round(pc_ratio, 3),
-                'total_put_oi': total_put_oi,
-                'total_call_oi': total_call_oi,
-                'nearby_strikes': nearby_strikes,
-                'calculation_time': datetime.now().isoformat(),
-                'total_contracts_analyzed': len(df)
-            }
-            
-            self.logger.info(f"Max pain calculated at ${max_pain_price:.2f}")
-            return result
+            return self._max_pain_arrays(
+                arrays['strikes'], arrays['put_oi'], arrays['call_oi'],
+                current_stock_price, validate=_validate, contract_count=contract_count
+            )
             
         except Exception as e:
             self.logger.error(f"Error calculating max pain: {str(e)}")
             raise
     
+    def _build_arrays(self, options_data, expirations=True):
+        """
+        Convert option contract dicts into parallel per-contract arrays.
+        
+        Args:
+            options_data: List of dictionaries containing option contract data
+            expirations: Whether to include the expiration date array
+            
+        Returns:
+            Dictionary of arrays keyed by 'strikes', 'put_oi', 'call_oi' and,
+            if requested, 'exp'. Each contract's open interest is in the column
+            for its type and zero in the other.
+        """
+        n = len(options_data)
+        oi = np.fromiter((o['open_interest'] for o in options_data), dtype=np.float64, count=n)
+        is_call = np.fromiter((o['contract_type'] == 'call' for o in options_data), dtype=bool, count=n)
+        is_put = np.fromiter((o['contract_type'] == 'put' for o in options_data), dtype=bool, count=n)
+        arrays = {
+            'strikes': np.fromiter((o['strike_price'] for o in options_data), dtype=np.float64, count=n),
+            'put_oi': np.where(is_put, oi, 0.0),
+            'call_oi': np.where(is_call, oi, 0.0),
+        }
+        if expirations:
+            arrays['exp'] = np.array([o['expiration_date'] for o in options_data], dtype=str)
+        return arrays
+    
+    def _aggregate_by_expiration(self, arrays):
+        """
+        Sum open interest per (expiration, strike) for all expirations at once.
+        
+        Contracts with zero open interest are dropped first, as in
+        _max_pain_arrays.
+        
+        Returns:
+            Tuple of (sorted unique expiration dates, strike slice bounds,
+            contract count per expiration, aggregated arrays keyed by
+            'strikes', 'put_oi' and 'call_oi'), where expiration i's sorted
+            strikes span bounds[i]:bounds[i + 1]
+        """
+        exp_dates, exp_idx = np.unique(arrays['exp'], return_inverse=True)
+        
+        has_oi = (arrays['put_oi'] + arrays['call_oi']) > 0
+        order = np.lexsort((arrays['strikes'][has_oi], exp_idx[has_oi]))
+        exp_idx = exp_idx[has_oi][order]
+        strikes = arrays['strikes'][has_oi][order]
+        
+        # First row of each distinct (expiration, strike) pair
+        new_key = np.ones(len(strikes), dtype=bool)
+        new_key[1:] = (exp_idx[1:] != exp_idx[:-1]) | (strikes[1:] != strikes[:-1])
+        starts = np.flatnonzero(new_key)
+        
+        agg = {'strikes': strikes[starts]}
+        for key in ('put_oi', 'call_oi'):
+            values = arrays[key][has_oi][order]
+            agg[key] = np.add.reduceat(values, starts) if len(starts) else values
+        
+        groups = np.arange(len(exp_dates) + 1)
+        strike_bounds = np.searchsorted(exp_idx[starts], groups).astype(np.int64)
+        contract_counts = np.diff(np.searchsorted(exp_idx, groups))
+        return exp_dates, strike_bounds, contract_counts, agg
+    
+    def _max_pain_arrays(self, strike_array, put_oi_array, call_oi_array, current_stock_price=None,
+                         validate=True, contract_count=None):
+        """
+        Calculate max pain from parallel per-contract arrays.
+        
+        Args:
+            strike_array: Strike price of each contract
+            put_oi_array: Put open interest of each contract
+            call_oi_array: Call open interest of each contract
+            current_stock_price: Current price of the underlying stock
+            validate: Filter out contracts with zero open interest
+            contract_count: Contracts the arrays represent, if rows were
+                pre-aggregated; defaults to the number of rows
+            
+        Returns:
+            Dictionary containing max pain price and related statistics
+        """
+        # Filter out contracts with zero open interest
+        if validate:
+            has_oi = (put_oi_array + call_oi_array) > 0
+            strike_array = strike_array[has_oi]
+            put_oi_array = put_oi_array[has_oi]
+            call_oi_array = call_oi_array[has_oi]
+        
+        if not len(strike_array) or not (put_oi_array.sum() + call_oi_array.sum()):
+            raise ValueError("No options with open interest found")
+        
+        # Aggregate call/put open interest onto the sorted unique strikes
+        strikes, inverse = np.unique(strike_array, return_inverse=True)
+        call_oi = np.zeros(len(strikes), dtype=np.float64)
+        put_oi = np.zeros(len(strikes), dtype=np.float64)
+        np.add.at(call_oi, inverse, call_oi_array)
+        np.add.at(put_oi, inverse, put_oi_array)
+        
+        max_pain_idx, pain = _max_pain_kernel(np.ascontiguousarray(strikes), put_oi, call_oi)
+        
+        return self._build_result(
+            strikes, pain, int(max_pain_idx),
+            int(put_oi_array.sum()), int(call_oi_array.sum()),
+            contract_count if contract_count is not None else len(strike_array),
+            current_stock_price
+        )
+    
+    def _build_result(self, strikes, pain, max_pain_idx, total_put_oi, total_call_oi,
+                      contract_count, current_stock_price=None):
+        """
+        Assemble the result dictionary for one max pain calculation.
+        
+        Args:
+            strikes: Sorted unique strike prices
+            pain: Total pain at each strike
+            max_pain_idx: Index of the minimum pain strike
+            total_put_oi: Total put open interest
+            total_call_oi: Total call open interest
+            contract_count: Number of contracts analyzed
+            current_stock_price: Current price of the underlying stock
+            
+        Returns:
+            Dictionary containing max pain price and related statistics
+        """
+        # The strike price with minimum total pain (max pain for option holders)
+        max_pain_price = float(strikes[max_pain_idx])
+        
+        # Calculate Put/Call ratio
+        pc_ratio = total_put_oi / total_call_oi if total_call_oi > 0 else 0
+        
+        # Get nearby strikes for context from a slice around the max pain index
+        lo, hi = max(0, max_pain_idx - 2), min(len(strikes), max_pain_idx + 3)
+        nearby_strikes = [
+            {'strike': s, 'pain': p, 'is_max_pain': i == max_pain_idx}
+            for i, (s, p) in enumerate(zip(strikes[lo:hi].tolist(), pain[lo:hi].tolist()), start=lo)
+        ]
+        
+        # Signed distance from the current price, shared by both distance fields
+        csp = current_stock_price
+        delta = (max_pain_price - csp) if csp else None
+        
+        result = {
+            'max_pain_price': max_pain_price,
+            'current_stock_price': current_stock_price,
+            'distance_from_current': abs(delta) if delta is not None else None,
+            'percentage_from_current': (delta / csp * 100) if delta is not None else None,
+            'put_call_ratio': round(pc_ratio, 3),
+            'total_put_oi': total_put_oi,
+            'total_call_oi': total_call_oi,
+            'nearby_strikes': nearby_strikes,
+            'calculation_time': datetime.now().isoformat(),
+            'total_contracts_analyzed': contract_count
+        }
+        
+        self.logger.info(f"Max pain calculated at ${max_pain_price:.2f}")
+        return result
+    
     def get_expiration_dates(self, options_data):
         """
         Get unique expiration dates from options data.
         """
-        df = pd.DataFrame(options_data)
-        return sorted(df['expiration_date'].unique())
+        return sorted({o['expiration_date'] for o in options_data})
     
     def calculate_max_pain_by_expiration(self, options_data, current_stock_price=None):
         """
         Calculate max pain for each expiration date.
         """
         results = {}
-        df = pd.DataFrame(options_data)
-        
-        for exp_date in self.get_expiration_dates(options_data):
-            exp_data = df[df['expiration_date'] == exp_date].to_dict('records')
-            try:
-                results[exp_date] = self.calculate_max_pain(exp_data, current_stock_price)
-                results[exp_date]['expiration_date'] = exp_date
-            except Exception as e:
-                self.logger.warning(f"Could not calculate max pain for {exp_date}: {str(e)}")
+        exp_dates, strike_bounds, contract_counts, agg = self._aggregate_by_expiration(
+            self._build_arrays(options_data)
+        )
+        for i, exp_date in enumerate(exp_dates):
+            exp_date = str(exp_date)
+            lo, hi = strike_bounds[i], strike_bounds[i + 1]
+            if lo == hi:
+                self.logger.warning(
+                    f"Could not calculate max pain for {exp_date}: No options with open interest found"
+                )
                 continue
+            
+            strikes = agg['strikes'][lo:hi]
+            put_oi = agg['put_oi'][lo:hi]
+            call_oi = agg['call_oi'][lo:hi]
+            max_pain_idx, pain = _max_pain_kernel(strikes, put_oi, call_oi)
+            
+            results[exp_date] = self._build_result(
+                strikes, pain, int(max_pain_idx), int(put_oi.sum()), int(call_oi.sum()),
+                int(contract_counts[i]), current_stock_price
+            )
+            results[exp_date]['expiration_date'] = exp_date
         
         return results
     
@@ -127,24 +310,39 @@ class MaxPainCalculator:
         """
         Calculate max pain for the nearest expiration date only.
         """
-        df = pd.DataFrame(options_data)
+        exp_dates, strike_bounds, contract_counts, agg = self._aggregate_by_expiration(
+            self._build_arrays(options_data)
+        )
+        
+        # Days to expiration for each distinct date, in one datetime64 subtraction
+        today = np.datetime64(datetime.now().date(), 'D')
+        days_to_exp = (exp_dates.astype('datetime64[D]') - today).astype(np.int64)
         
-        # Get nearest expiration date
-        today = datetime.now().date()
-        df['exp_date'] = pd.to_datetime(df['expiration_date']).dt.date
-        df['days_to_exp'] = df['exp_date'].apply(lambda x: (x - today).days)
+        # Open interest per expiration from a running total over its strike slice
+        oi_cum = np.concatenate(([0.0], np.cumsum(agg['put_oi'] + agg['call_oi'])))
+        exp_oi = oi_cum[strike_bounds[1:]] - oi_cum[strike_bounds[:-1]]
         
         # Filter to nearest expiration with enough liquidity
-        nearest_exp = df[df['days_to_exp'] >= 0].groupby('expiration_date')['open_interest'].sum()
-        nearest_exp = nearest_exp[nearest_exp > 1000].index.min()  # Minimum OI threshold
+        suitable = np.flatnonzero((days_to_exp >= 0) & (exp_oi > 1000))  # Minimum OI threshold
         
-        if not nearest_exp:
+        if not len(suitable):
             raise ValueError("No suitable expiration date found")
         
+        nearest = suitable[0]
+        nearest_exp = str(exp_dates[nearest])
+        
         # Calculate max pain for nearest expiration
-        nearest_data = df[df['expiration_date'] == nearest_exp].to_dict('records')
-        result = self.calculate_max_pain(nearest_data, current_stock_price)
+        lo, hi = strike_bounds[nearest], strike_bounds[nearest + 1]
+        strikes = agg['strikes'][lo:hi]
+        put_oi = agg['put_oi'][lo:hi]
+        call_oi = agg['call_oi'][lo:hi]
+        max_pain_idx, pain = _max_pain_kernel(strikes, put_oi, call_oi)
+        
+        result = self._build_result(
+            strikes, pain, int(max_pain_idx), int(put_oi.sum()), int(call_oi.sum()),
+            int(contract_counts[nearest]), current_stock_price
+        )
         result['expiration_date'] = nearest_exp
-        result['days_to_expiration'] = (pd.to_datetime(nearest_exp).date() - today).days
+        result['days_to_expiration'] = int(days_to_exp[nearest])
         
-        return result
\ No newline at end of file
+        return result
@@ -1,19 +1,42 @@
-import os
-from datetime import datetime, timedelta
+import asyncio
+from contextlib import aclosing
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import httpx
+import numpy as np
+import orjson
 from polygon import RESTClient
-from dotenv import load_dotenv
 import logging
+from cache import FileCache
+from config import CONFIG, seconds_until_next_weekday_time
 
-load_dotenv()
+POLYGON_BASE_URL = "https://api.polygon.io"
+SNAPSHOT_PAGE_LIMIT = 250
+
+# Cached snapshots expire at the next market open
+MARKET_OPEN_HOUR = 9
+MARKET_OPEN_MINUTE = 30
+
+@lru_cache(maxsize=128)
+def _parse_exp(exp_date):
+    """Parse a YYYY-MM-DD expiration date, cached since chains repeat a few dates."""
+    return date.fromisoformat(exp_date)
 
 class PolygonOptionsClient:
     def __init__(self):
-        self.api_key = os.getenv('POLYGON_API_KEY')
+        self.api_key = CONFIG.polygon_api_key
         if not self.api_key:
             raise ValueError("POLYGON_API_KEY not found in environment variables")
         
         self.client = RESTClient(self.api_key)
         self.logger = logging.getLogger(__name__)
+        self.market_timezone_name = CONFIG.market_timezone
+        self.cache = FileCache()
+        
+        # One pooled async HTTP client per event loop, so pages and concurrent
+        # tickers reuse kept-alive connections instead of new TLS handshakes
+        self._http = None
+        self._http_loop = None
     
     def get_options_chain(self, ticker, expiration_date=None):
         """
@@ -61,25 +84,26 @@ class PolygonOptionsClient:
             for snapshot in self.client.list_snapshot_options_chain(ticker):
                 try:
                     # Extract details
-                    details = snapshot.details if hasattr(snapshot, 'details') else None
+                    details = getattr(snapshot, 'details', None)
                     if not details:
                         continue
                     
                     # Only get contracts for the specific expiration date
-                    if details.expiration_date != expiration_date:
+                    exp_date = details.expiration_date
+                    if exp_date != expiration_date:
                         continue
                     
                     # Extract day data
-                    day = snapshot.day if hasattr(snapshot, 'day') else None
+                    day = getattr(snapshot, 'day', None)
                     
                     snapshot_info = {
                         'contract_ticker': details.ticker,
                         'strike_price': float(details.strike_price),
                         'contract_type': details.contract_type,
-                        'expiration_date': details.expiration_date,
-                        'open_interest': int(snapshot.open_interest) if hasattr(snapshot, 'open_interest') else 0,
-                        'volume': int(day.volume) if day and hasattr(day, 'volume') else 0,
-                        'last_price': float(day.close) if day and hasattr(day, 'close') else 0
+                        'expiration_date': exp_date,
+                        'open_interest': int(getattr(snapshot, 'open_interest', 0)),
+                        'volume': int(day.volume) if day is not None else 0,
+                        'last_price': float(day.close) if day is not None else 0
                     }
                     
                     # Only include contracts with some open interest
@@ -97,79 +121,201 @@ class PolygonOptionsClient:
             self.logger.error(f"Error getting options snapshot: {str(e)}")
             raise
     
-    def get_options_snapshot_fast(self, ticker):
+    def _get_http(self):
         """
-        Get options data for the nearest expiration in a single efficient call.
-        Returns the nearest expiration date and its options data.
+        Return the shared async HTTP client for the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http_loop is not loop:
+            # The key goes in a header so it never appears in logged URLs or errors
+            self._http = httpx.AsyncClient(
+                headers={'Authorization': f'Bearer {self.api_key}'},
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=4)
+            )
+            self._http_loop = loop
+        return self._http
+    
+    async def aclose(self):
+        """
+        Close the shared async HTTP client.
+        """
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+            self._http_loop = None
+    
+    async def _fetch_snapshot_page(self, http, url, params=None):
+        """
+        Fetch and decode one page of the options chain snapshot.
+        """
+        # next_url already carries its cursor, so merge rather than replace the query
+        url = httpx.URL(url).copy_merge_params(params or {})
+        response = await http.get(url)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    
+    async def _iter_snapshot_pages(self, http, ticker):
+        """
+        Yield pages of options chain snapshot results.
+        
+        The request for the next page is started before the current page is
+        yielded, so it is in flight while the caller processes the results.
         """
+        pending = asyncio.ensure_future(self._fetch_snapshot_page(
+            http,
+            f"{POLYGON_BASE_URL}/v3/snapshot/options/{ticker}",
+            {'limit': SNAPSHOT_PAGE_LIMIT}
+        ))
         try:
-            snapshots = []
-            today = datetime.now().date()
-            nearest_exp = None
-            seen_expirations = set()
-            
-            # Use the iterator but stop after finding nearest expiration data
-            count = 0
-            for snapshot in self.client.list_snapshot_options_chain(ticker):
-                count += 1
+            while pending is not None:
+                page = await pending
+                next_url = page.get('next_url')
+                pending = asyncio.ensure_future(
+                    self._fetch_snapshot_page(http, next_url)
+                ) if next_url else None
                 
-                # Stop if we've checked too many contracts (safety limit)
-                if count > 500:
-                    break
-                
-                try:
-                    details = snapshot.details if hasattr(snapshot, 'details') else None
-                    if not details:
-                        continue
-                    
-                    exp_date = details.expiration_date
-                    exp_date_obj = datetime.strptime(exp_date, '%Y-%m-%d').date()
-                    
-                    # Skip past expirations
-                    if exp_date_obj < today:
-                        continue
-                    
-                    # Track expiration dates we've seen
-                    seen_expirations.add(exp_date)
+                yield page.get('results') or []
+        finally:
+            if pending is not None:
+                pending.cancel()
+    
+    async def _get_options_snapshot_fast(self, ticker):
+        """
+        Collect the nearest expiration's contracts from the paged snapshot.
+        
+        Returns:
+            Tuple of (nearest expiration date, per-contract lists keyed by
+            'strikes', 'put_oi' and 'call_oi')
+        """
+        strikes, put_oi, call_oi = [], [], []
+        today = datetime.now().date()
+        nearest_exp = None
+        seen_expirations = set()
+        
+        # Walk the pages but stop after finding nearest expiration data
+        count = 0
+        done = False
+        http = self._get_http()
+        async with aclosing(self._iter_snapshot_pages(http, ticker)) as pages:
+            async for page in pages:
+                for snapshot in page:
+                    count += 1
                     
-                    # Set nearest expiration on first valid date
-                    if nearest_exp is None:
-                        nearest_exp = exp_date
-                        self.logger.info(f"Found nearest expiration: {nearest_exp}")
+                    # Stop if we've checked too many contracts (safety limit)
+                    if count > 500:
+                        done = True
+                        break
                     
-                    # Only collect data for the nearest expiration
-                    if exp_date == nearest_exp:
-                        day = snapshot.day if hasattr(snapshot, 'day') else None
-                        oi = int(snapshot.open_interest) if hasattr(snapshot, 'open_interest') else 0
+                    try:
+                        details = snapshot.get('details')
+                        if not details:
+                            continue
                         
-                        if oi > 0:
-                            snapshot_info = {
-                                'contract_ticker': details.ticker,
-                                'strike_price': float(details.strike_price),
-                                'contract_type': details.contract_type,
-                                'expiration_date': exp_date,
-                                'open_interest': oi,
-                                'volume': int(day.volume) if day and hasattr(day, 'volume') else 0,
-                                'last_price': float(day.close) if day and hasattr(day, 'close') else 0
-                            }
-                            snapshots.append(snapshot_info)
-                    
-                    # If we've seen more than one expiration and have data, we can stop
-                    elif len(seen_expirations) > 1 and len(snapshots) > 50:
-                        self.logger.info(f"Stopping early - found {len(snapshots)} contracts for nearest expiration")
-                        break
+                        exp_date = details['expiration_date']
+                        exp_date_obj = _parse_exp(exp_date)
                         
-                except Exception as e:
-                    self.logger.debug(f"Error processing snapshot: {str(e)}")
-                    continue
+                        # Skip past expirations
+                        if exp_date_obj < today:
+                            continue
+                        
+                        # Track expiration dates we've seen
+                        seen_expirations.add(exp_date)
+                        
+                        # Set nearest expiration on first valid date
+                        if nearest_exp is None:
+                            nearest_exp = exp_date
+                            self.logger.info(f"Found nearest expiration: {nearest_exp}")
+                        
+                        # Only collect data for the nearest expiration
+                        if exp_date == nearest_exp:
+                            oi = int(snapshot.get('open_interest') or 0)
+                            
+                            if oi > 0:
+                                is_put = details['contract_type'] == 'put'
+                                strikes.append(float(details['strike_price']))
+                                put_oi.append(oi if is_put else 0)
+                                call_oi.append(0 if is_put else oi)
+                        
+                        # If we've seen more than one expiration and have data, we can stop
+                        elif len(seen_expirations) > 1 and len(strikes) > 50:
+                            self.logger.info(f"Stopping early - found {len(strikes)} contracts for nearest expiration")
+                            done = True
+                            break
+                            
+                    except Exception as e:
+                        self.logger.debug(f"Error processing snapshot: {str(e)}")
+                        continue
+                
+                if done:
+                    break
+        
+        self.logger.info(f"Retrieved {len(strikes)} contracts for {ticker} expiring {nearest_exp}")
+        return nearest_exp, {'strikes': strikes, 'put_oi': put_oi, 'call_oi': call_oi}
+    
+    async def get_options_snapshot_fast_async(self, ticker):
+        """
+        Async version of get_options_snapshot_fast, for fetching several
+        tickers concurrently on one event loop.
+        """
+        try:
+            # Open interest only changes overnight, so a snapshot stays valid
+            # until the next market open. Set FORCE_REFRESH to bypass it.
+            cache_key = f"{ticker}_options_{date.today().strftime('%Y%m%d')}"
+            if not CONFIG.force_refresh:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    arrays = cached['arrays']
+                    for key in ('strikes', 'put_oi', 'call_oi'):
+                        arrays[key] = np.asarray(arrays[key], dtype=np.float64)
+                    return cached['nearest_exp'], arrays
+            
+            nearest_exp, columns = await self._get_options_snapshot_fast(ticker)
+            arrays = self._to_arrays(columns)
             
-            self.logger.info(f"Retrieved {len(snapshots)} contracts for {ticker} expiring {nearest_exp}")
-            return nearest_exp, snapshots
+            if arrays['contract_count']:
+                self.cache.set(
+                    cache_key,
+                    {'nearest_exp': nearest_exp, 'arrays': arrays},
+                    ttl=seconds_until_next_weekday_time(
+                        self.market_timezone_name, MARKET_OPEN_HOUR, MARKET_OPEN_MINUTE
+                    )
+                )
+            
+            return nearest_exp, arrays
             
         except Exception as e:
             self.logger.error(f"Error getting fast options snapshot: {str(e)}")
             raise
     
+    def _to_arrays(self, columns):
+        """
+        Sum per-contract lists onto unique strikes, as the arrays the calculator takes.
+        """
+        strikes, inverse = np.unique(np.asarray(columns['strikes'], dtype=np.float64),
+                                     return_inverse=True)
+        return {
+            'strikes': strikes,
+            'put_oi': np.bincount(inverse, weights=columns['put_oi'], minlength=len(strikes)),
+            'call_oi': np.bincount(inverse, weights=columns['call_oi'], minlength=len(strikes)),
+            'contract_count': len(inverse),
+        }
+    
+    def get_options_snapshot_fast(self, ticker):
+        """
+        Get options data for the nearest expiration in a single efficient call.
+        Returns the nearest expiration date and a mapping of sorted unique
+        'strikes' with their summed 'put_oi' and 'call_oi' arrays, plus the
+        'contract_count' they were built from.
+        """
+        async def fetch():
+            try:
+                return await self.get_options_snapshot_fast_async(ticker)
+            finally:
+                await self.aclose()
+        
+        return asyncio.run(fetch())
+    
     def get_current_stock_price(self, ticker):
         """
         Get the current stock price for the underlying ticker.
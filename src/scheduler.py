@@ -1,96 +1,208 @@
-import schedule
-import time
+import asyncio
 import logging
-from datetime import datetime
-import pytz
-import os
-from dotenv import load_dotenv
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+import exchange_calendars
+import httpx
+import urllib3
+from config import CONFIG, seconds_until_next_weekday_time
 from polygon_client import PolygonOptionsClient
 from max_pain_calculator import MaxPainCalculator
 from data_manager import DataManager
 
-load_dotenv()
+# Daily run time in market time (1 minute after market open)
+RUN_HOUR = 9
+RUN_MINUTE = 31
+
+# Exchange calendar used to skip holidays, and how far ahead sessions are cached
+MARKET_CALENDAR = 'XNYS'
+SESSION_CACHE_DAYS = 30
+
+# Polygon calls are retried this many times, doubling the delay from RETRY_BASE seconds
+RETRY_ATTEMPTS = 3
+RETRY_BASE = 1.0
+
+def _is_retryable(exc):
+    """
+    Whether a Polygon failure is transient: a network error, timeout,
+    rate limit (429) or server error (5xx).
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    # urllib3 errors come from the SDK once its own short retries run out
+    return isinstance(exc, (httpx.TransportError, urllib3.exceptions.HTTPError, TimeoutError))
 
 class MaxPainScheduler:
+    # Created once per process but read throughout the run loop
+    __slots__ = (
+        'logger', 'tickers', 'ticker', 'market_timezone', 'polygon_client',
+        'calculator', 'data_manager', '_sessions', '_sessions_until'
+    )
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.ticker = os.getenv('TICKER', 'SPY')
-        self.market_timezone = pytz.timezone(os.getenv('MARKET_TIMEZONE', 'America/New_York'))
+        # TICKER may be a comma-separated list; the first is the primary ticker
+        self.tickers = CONFIG.tickers
+        self.ticker = self.tickers[0]
+        self.market_timezone = ZoneInfo(CONFIG.market_timezone)
         self.polygon_client = PolygonOptionsClient()
         self.calculator = MaxPainCalculator()
         self.data_manager = DataManager()
+        self._sessions = set()
+        self._sessions_until = None
         
+    def _refresh_sessions(self, today):
+        """
+        Cache the exchange trading sessions for the next SESSION_CACHE_DAYS days.
+        """
+        end = today + timedelta(days=SESSION_CACHE_DAYS)
+        calendar = exchange_calendars.get_calendar(MARKET_CALENDAR, start=today, end=end)
+        self._sessions = set(calendar.sessions.date)
+        self._sessions_until = end
+    
     def is_market_day(self):
         """
-        Check if today is a market day (Monday-Friday, excluding holidays).
-        Note: This is a simple check. For production, use a market calendar API.
+        Check if today is a market day (a trading session on the exchange
+        calendar, so weekends and market holidays are both skipped).
         """
-        now = datetime.now(self.market_timezone)
-        # Monday = 0, Sunday = 6
-        return now.weekday() < 5
+        today = datetime.now(self.market_timezone).date()
+        if self._sessions_until is None or today > self._sessions_until:
+            self._refresh_sessions(today)
+        return today in self._sessions
     
-    def calculate_and_save_max_pain(self):
+    async def calculate_and_save_max_pain(self):
         """
-        Main function to calculate max pain and save results.
+        Main function to calculate max pain and save results for every ticker.
+        """
+        # I/O-bound: Polygon requests (~100-500ms) dwarf the max pain kernel (~1ms), see the timings log
+        if not self.is_market_day():
+            self.logger.info("Not a market day, skipping calculation")
+            return
+        
+        # Tickers run concurrently so their Polygon requests overlap
+        results = await asyncio.gather(
+            *(self._calculate_and_save_ticker(ticker) for ticker in self.tickers),
+            return_exceptions=True
+        )
+        
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            raise errors[0]
+    
+    async def _calculate_and_save_ticker(self, ticker):
+        """
+        Calculate max pain for one ticker and save results.
         """
         try:
-            if not self.is_market_day():
-                self.logger.info("Not a market day, skipping calculation")
-                return
+            self.logger.info(f"Starting max pain calculation for {ticker}")
+            timings = {}
             
-            self.logger.info(f"Starting max pain calculation for {self.ticker}")
-            
-            # Get current stock price
-            current_price = self.polygon_client.get_current_stock_price(self.ticker)
-            self.logger.info(f"Current {self.ticker} price: ${current_price:.2f}")
+            # Get current stock price (the REST client is synchronous)
+            t0 = time.perf_counter()
+            current_price = await self._retry(
+                asyncio.to_thread, self.polygon_client.get_current_stock_price, ticker
+            )
+            self._record_timing(timings, "stock_price", t0)
+            self.logger.info(f"Current {ticker} price: ${current_price:.2f}")
             
             # Get options data for nearest expiration in one fast call
-            nearest_exp, options_data = self.polygon_client.get_options_snapshot_fast(self.ticker)
+            t0 = time.perf_counter()
+            nearest_exp, options_data = await self._retry(
+                self.polygon_client.get_options_snapshot_fast_async, ticker
+            )
+            self._record_timing(timings, "options_snapshot", t0)
             
-            if not options_data:
-                self.logger.warning("No options data retrieved")
+            if not len(options_data['strikes']):
+                self.logger.warning(f"No options data retrieved for {ticker}")
                 return
             
             # Calculate max pain for this specific expiration
+            t0 = time.perf_counter()
             result = self.calculator.calculate_max_pain(options_data, current_price)
+            self._record_timing(timings, "calculate", t0)
             result['expiration_date'] = nearest_exp
-            result['days_to_expiration'] = (datetime.strptime(nearest_exp, '%Y-%m-%d').date() - datetime.now().date()).days
+            today = date.today()
+            result['days_to_expiration'] = (date.fromisoformat(nearest_exp) - today).days
             
-            # Save results
-            self.data_manager.save_calculation_results(self.ticker, result)
+            # Save detailed results and the daily summary together
+            t0 = time.perf_counter()
+            self.data_manager.save_all(ticker, result, current_price)
+            self._record_timing(timings, "save", t0)
             
             # Log summary
             self.logger.info(
-                f"Max Pain for {result['expiration_date']} ({result['days_to_expiration']} days): "
+                f"{ticker} Max Pain for {result['expiration_date']} ({result['days_to_expiration']} days): "
                 f"${result['max_pain_price']:.2f}, "
                 f"P/C Ratio: {result['put_call_ratio']}, "
                 f"Distance from current: {result['percentage_from_current']:.2f}%"
             )
             
-            # Save daily summary
-            self.data_manager.save_daily_summary(self.ticker, result, current_price)
-            
-            self.logger.info("Max pain calculation completed successfully")
+            self.logger.info(f"{ticker} timings (ms): {timings}")
+            self.logger.info(f"Max pain calculation for {ticker} completed successfully")
             
         except Exception as e:
-            self.logger.error(f"Error in max pain calculation: {str(e)}")
+            self.logger.error(f"Error in max pain calculation for {ticker}: {str(e)}")
             raise
     
+    async def _retry(self, fn, *args, retries=RETRY_ATTEMPTS, base=RETRY_BASE):
+        """
+        Await fn(*args), retrying transient Polygon errors with exponential backoff.
+        """
+        for attempt in range(retries + 1):
+            try:
+                return await fn(*args)
+            except Exception as e:
+                if attempt == retries or not _is_retryable(e):
+                    raise
+                delay = base * 2 ** attempt
+                self.logger.warning(
+                    f"Polygon request failed ({e!r}), retrying in {delay:.0f}s "
+                    f"({attempt + 1}/{retries})"
+                )
+                await asyncio.sleep(delay)
+    
+    def _record_timing(self, timings, step, t0):
+        """
+        Store the milliseconds elapsed since t0 under step and log them.
+        """
+        ms = (time.perf_counter() - t0) * 1000
+        timings[step] = round(ms, 1)
+        self.logger.debug("step=%s ms=%.1f", step, ms)
+    
+    def _seconds_until_next_run(self):
+        """
+        Seconds until the next 9:31 AM ET on a weekday.
+        """
+        return seconds_until_next_weekday_time(self.market_timezone.key, RUN_HOUR, RUN_MINUTE)
+    
     def run_scheduler(self):
         """
         Run the scheduler to execute calculations at market open.
         """
-        # Schedule to run at 9:31 AM ET (1 minute after market open)
-        schedule.every().day.at("09:31").do(self.calculate_and_save_max_pain)
-        
         self.logger.info("Scheduler started. Will run daily at 9:31 AM ET on market days.")
-        
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+        asyncio.run(self._run_scheduler())
+    
+    async def _run_scheduler(self):
+        # Sleep straight through to the next run instead of polling
+        try:
+            while True:
+                delay = self._seconds_until_next_run()
+                self.logger.info(f"Next calculation in {delay / 3600:.1f} hours")
+                await asyncio.sleep(delay)
+                await self.calculate_and_save_max_pain()
+        finally:
+            await self.polygon_client.aclose()
+    
+    async def _run_once(self):
+        try:
+            await self.calculate_and_save_max_pain()
+        finally:
+            await self.polygon_client.aclose()
     
     def run_once(self):
         """
         Run the calculation once (for testing or manual execution).
         """
-        self.calculate_and_save_max_pain()
\ No newline at end of file
+        asyncio.run(self._run_once())
\ No newline at end of file
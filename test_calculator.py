@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
-import os
 import sys
 sys.path.append('src')
 
 from polygon_client import PolygonOptionsClient
 from max_pain_calculator import MaxPainCalculator
 from data_manager import DataManager
-from datetime import datetime
+from config import CONFIG
+from datetime import date
 import logging
 
 # Set up logging
@@ -19,7 +19,7 @@ def test_max_pain_calculation():
     """Test the max pain calculation with real data."""
     try:
         # Initialize components
-        ticker = os.getenv('TICKER', 'SPY')
+        ticker = CONFIG.tickers[0]
         polygon_client = PolygonOptionsClient()
         calculator = MaxPainCalculator()
         data_manager = DataManager()
@@ -35,21 +35,21 @@ def test_max_pain_calculation():
         print("\nFetching options data for nearest expiration...")
         nearest_exp, options_data = polygon_client.get_options_snapshot_fast(ticker)
         
-        if not options_data:
+        if not len(options_data['strikes']):
             print("No options data retrieved")
             return
         
-        print(f"Retrieved {len(options_data)} option contracts for {nearest_exp}")
+        print(f"Retrieved {options_data['contract_count']} option contracts for {nearest_exp}")
         
         # Calculate max pain
         print("\nCalculating max pain...")
         result = calculator.calculate_max_pain(options_data, current_price)
         result['expiration_date'] = nearest_exp
-        result['days_to_expiration'] = (datetime.strptime(nearest_exp, '%Y-%m-%d').date() - datetime.now().date()).days
+        today = date.today()
+        result['days_to_expiration'] = (date.fromisoformat(nearest_exp) - today).days
         
         # Save results
-        data_manager.save_calculation_results(ticker, result)
-        data_manager.save_daily_summary(ticker, result, current_price)
+        data_manager.save_all(ticker, result, current_price)
         
         # Generate and print report
         report = data_manager.generate_report(ticker, result, current_price)
@@ -63,8 +63,4 @@ def test_max_pain_calculation():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    # Load environment variables
-    from dotenv import load_dotenv
-    load_dotenv()
-    
     test_max_pain_calculation()
\ No newline at end of file